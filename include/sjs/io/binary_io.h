@@ -18,10 +18,20 @@
 //     hi[dim] (scalar)
 //     (optional) id (u32) if flags & kHasIds
 //
+// Version 2 adds a column-wise (SoA) payload, marked by flags & kSoA:
+//   lo[count][dim] (scalar), then hi[count][dim] (scalar),
+//   then (optional) id[count] (u32) if flags & kHasIds
+// Only SoA files use version 2; the writer below still emits version 1.
+//
 // Notes:
 //  - Scalars can be stored as float32 or float64; we currently write float64 by default.
 //  - Half-open semantics are indicated by a header flag (kHalfOpen).
 //  - Endianness is assumed little-endian; file header includes a marker to detect mismatch.
+//  - kBlosc marks a chunked, Blosc-compressed record payload written by
+//    tools/alacarte_rectgen_generate.py --compression=blosc: the per-record
+//    payload above, split into [u64 compressed_len][Blosc chunk] blocks.
+//    Decoding needs c-blosc (configure with -DSJS_WITH_BLOSC=ON, which defines
+//    SJS_HAVE_BLOSC); other builds reject such files instead of misparsing them.
 //
 // This header provides:
 //  - BinaryWriteOptions / BinaryReadOptions
@@ -36,18 +46,27 @@
 #include <cstdint>
 #include <cstring>
 #include <fstream>
+#include <istream>
 #include <limits>
 #include <optional>
+#include <streambuf>
 #include <string>
 #include <string_view>
 #include <utility>
 #include <vector>
 
+#ifdef SJS_HAVE_BLOSC
+#include <blosc.h>
+#endif
+
 namespace sjs {
 namespace binary {
 
 inline constexpr u64 kEndianMarker = 0x0102030405060708ULL;
-inline constexpr u32 kFormatVersion = 1;
+// Newest version understood by ReadRelationBinary.
+inline constexpr u32 kFormatVersion = 2;
+// Version written for interleaved (per-record) payloads.
+inline constexpr u32 kFormatVersionAoS = 1;
 
 // 8-byte magic: "SJSBOX\0\0"
 inline constexpr char kMagic[8] = {'S','J','S','B','O','X','\0','\0'};
@@ -55,6 +74,8 @@ inline constexpr char kMagic[8] = {'S','J','S','B','O','X','\0','\0'};
 enum HeaderFlags : u32 {
   kHalfOpen = 1u << 0,
   kHasIds   = 1u << 1,
+  kBlosc    = 1u << 2,
+  kSoA      = 1u << 3,
 };
 
 enum class ScalarEncoding : u32 {
@@ -111,7 +132,7 @@ inline void SetErr(std::string* err, const std::string& msg) {
   if (err) *err = msg;
 }
 
-inline bool ReadExact(std::ifstream& in, void* dst, std::size_t n, std::string* err) {
+inline bool ReadExact(std::istream& in, void* dst, std::size_t n, std::string* err) {
   in.read(reinterpret_cast<char*>(dst), static_cast<std::streamsize>(n));
   if (!in) {
     SetErr(err, "Binary read failed (unexpected EOF or IO error)");
@@ -129,7 +150,7 @@ inline bool WriteExact(std::ofstream& out, const void* src, std::size_t n, std::
   return true;
 }
 
-inline bool ReadU32(std::ifstream& in, u32* v, std::string* err) {
+inline bool ReadU32(std::istream& in, u32* v, std::string* err) {
   return ReadExact(in, v, sizeof(u32), err);
 }
 inline bool WriteU32(std::ofstream& out, u32 v, std::string* err) {
@@ -137,7 +158,7 @@ inline bool WriteU32(std::ofstream& out, u32 v, std::string* err) {
 }
 
 template <class T>
-inline bool ReadScalar(std::ifstream& in, T* v, std::string* err) {
+inline bool ReadScalar(std::istream& in, T* v, std::string* err) {
   return ReadExact(in, v, sizeof(T), err);
 }
 template <class T>
@@ -145,6 +166,54 @@ inline bool WriteScalar(std::ofstream& out, const T& v, std::string* err) {
   return WriteExact(out, &v, sizeof(T), err);
 }
 
+#ifdef SJS_HAVE_BLOSC
+// Read-only streambuf over a caller-owned byte range, so decoded payloads go
+// through the same record loops as file payloads.
+class MemoryStreamBuf : public std::streambuf {
+ public:
+  void Reset(char* data, std::size_t n) { setg(data, data, data + n); }
+};
+
+// Inflates a kBlosc payload ([u64 compressed_len][Blosc chunk] blocks) that
+// must decode to exactly `count` records of `rec_bytes` each.
+inline bool ReadBloscPayload(std::istream& in, u64 count, std::size_t rec_bytes,
+                             std::vector<char>* out, std::string* err) {
+  if (count > std::numeric_limits<std::size_t>::max() / rec_bytes) {
+    SetErr(err, "Blosc payload too large for this host");
+    return false;
+  }
+  const std::size_t total = static_cast<std::size_t>(count) * rec_bytes;
+  out->resize(total);
+
+  std::vector<char> packed;
+  std::size_t filled = 0;
+  while (filled < total) {
+    u64 clen = 0;
+    if (!ReadScalar(in, &clen, err)) return false;
+    if (clen < BLOSC_MIN_HEADER_LENGTH || clen > std::numeric_limits<std::size_t>::max()) {
+      SetErr(err, "Corrupt Blosc chunk length: " + std::to_string(clen));
+      return false;
+    }
+    packed.resize(static_cast<std::size_t>(clen));
+    if (!ReadExact(in, packed.data(), packed.size(), err)) return false;
+
+    std::size_t nbytes = 0, cbytes = 0, blocksize = 0;
+    blosc_cbuffer_sizes(packed.data(), &nbytes, &cbytes, &blocksize);
+    if (cbytes != packed.size() || nbytes % rec_bytes != 0 || nbytes > total - filled) {
+      SetErr(err, "Blosc chunk sizes do not match the record count in the header");
+      return false;
+    }
+    const int got = blosc_decompress_ctx(packed.data(), out->data() + filled, nbytes, 1);
+    if (got < 0 || static_cast<std::size_t>(got) != nbytes) {
+      SetErr(err, "Blosc decompression failed");
+      return false;
+    }
+    filled += nbytes;
+  }
+  return true;
+}
+#endif
+
 // -------------- write --------------
 template <int Dim, class T>
 bool WriteRelationBinary(const std::string& path,
@@ -172,7 +241,7 @@ bool WriteRelationBinary(const std::string& path,
 
   FileHeader h{};
   std::memcpy(h.magic, kMagic, sizeof(kMagic));
-  h.version = kFormatVersion;
+  h.version = kFormatVersionAoS;
   h.dim = static_cast<u32>(Dim);
   h.scalar_bits = static_cast<u32>(opt.scalar == ScalarEncoding::Float32 ? 32 : 64);
   h.flags = 0;
@@ -299,6 +368,23 @@ bool ReadRelationBinary(const std::string& path,
   }
   const bool file_half_open = (h.flags & kHalfOpen) != 0;
   const bool file_has_ids = (h.flags & kHasIds) != 0;
+  const bool file_soa = (h.flags & kSoA) != 0;
+  const bool file_blosc = (h.flags & kBlosc) != 0;
+  if (file_soa != (h.version >= 2)) {
+    SetErr(err, "SoA layout flag does not match binary format version " + std::to_string(h.version));
+    return false;
+  }
+#ifdef SJS_HAVE_BLOSC
+  if (file_blosc && file_soa) {
+    SetErr(err, "Blosc compression is only defined for per-record (v1) payloads");
+    return false;
+  }
+#else
+  if (file_blosc) {
+    SetErr(err, "Blosc-compressed SJSBOX payload needs a build with -DSJS_WITH_BLOSC=ON");
+    return false;
+  }
+#endif
 
   u32 name_len = 0;
   if (!ReadU32(in, &name_len, err)) return false;
@@ -318,29 +404,71 @@ bool ReadRelationBinary(const std::string& path,
     out_info->count = h.count;
   }
 
+  // Records are read from `src`: the file itself, or (kBlosc) the inflated
+  // payload held in memory.
+  std::istream* src = &in;
+#ifdef SJS_HAVE_BLOSC
+  std::vector<char> payload;
+  MemoryStreamBuf payload_buf;
+  std::istream payload_in(&payload_buf);
+  if (file_blosc) {
+    const std::size_t rec_bytes = 2u * static_cast<std::size_t>(Dim) * (h.scalar_bits / 8u) +
+                                  (file_has_ids ? sizeof(Id) : 0u);
+    if (!ReadBloscPayload(in, h.count, rec_bytes, &payload, err)) return false;
+    payload_buf.Reset(payload.data(), payload.size());
+    src = &payload_in;
+  }
+#endif
+
   Relation<Dim, T> rel;
   rel.name = name;
   rel.boxes.resize(static_cast<usize>(h.count));
   if (file_has_ids) rel.ids.resize(static_cast<usize>(h.count));
 
   // Read records with conversion if needed.
-  if (h.scalar_bits == 64) {
+  if (file_soa) {
+    // Column-wise payload: every lo point, then every hi point, then ids.
+    for (int pass = 0; pass < 2; ++pass) {
+      for (u64 i = 0; i < h.count; ++i) {
+        Box<Dim, T>& b = rel.boxes[static_cast<usize>(i)];
+        auto& p = (pass == 0) ? b.lo : b.hi;
+        for (int d = 0; d < Dim; ++d) {
+          if (h.scalar_bits == 64) {
+            double x;
+            if (!ReadScalar(*src, &x, err)) return false;
+            p.v[static_cast<usize>(d)] = static_cast<T>(x);
+          } else {
+            float x;
+            if (!ReadScalar(*src, &x, err)) return false;
+            p.v[static_cast<usize>(d)] = static_cast<T>(x);
+          }
+        }
+      }
+    }
+    if (file_has_ids) {
+      for (u64 i = 0; i < h.count; ++i) {
+        Id id;
+        if (!ReadScalar(*src, &id, err)) return false;
+        rel.ids[static_cast<usize>(i)] = id;
+      }
+    }
+  } else if (h.scalar_bits == 64) {
     for (u64 i = 0; i < h.count; ++i) {
       Box<Dim, T> b;
       for (int d = 0; d < Dim; ++d) {
         double x;
-        if (!ReadScalar(in, &x, err)) return false;
+        if (!ReadScalar(*src, &x, err)) return false;
         b.lo.v[static_cast<usize>(d)] = static_cast<T>(x);
       }
       for (int d = 0; d < Dim; ++d) {
         double x;
-        if (!ReadScalar(in, &x, err)) return false;
+        if (!ReadScalar(*src, &x, err)) return false;
         b.hi.v[static_cast<usize>(d)] = static_cast<T>(x);
       }
       rel.boxes[static_cast<usize>(i)] = b;
       if (file_has_ids) {
         Id id;
-        if (!ReadScalar(in, &id, err)) return false;
+        if (!ReadScalar(*src, &id, err)) return false;
         rel.ids[static_cast<usize>(i)] = id;
       }
     }
@@ -349,18 +477,18 @@ bool ReadRelationBinary(const std::string& path,
       Box<Dim, T> b;
       for (int d = 0; d < Dim; ++d) {
         float x;
-        if (!ReadScalar(in, &x, err)) return false;
+        if (!ReadScalar(*src, &x, err)) return false;
         b.lo.v[static_cast<usize>(d)] = static_cast<T>(x);
       }
       for (int d = 0; d < Dim; ++d) {
         float x;
-        if (!ReadScalar(in, &x, err)) return false;
+        if (!ReadScalar(*src, &x, err)) return false;
         b.hi.v[static_cast<usize>(d)] = static_cast<T>(x);
       }
       rel.boxes[static_cast<usize>(i)] = b;
       if (file_has_ids) {
         Id id;
-        if (!ReadScalar(in, &id, err)) return false;
+        if (!ReadScalar(*src, &id, err)) return false;
         rel.ids[static_cast<usize>(i)] = id;
       }
     }
@@ -0,0 +1,251 @@
+// tests/test_binary_io.cpp
+//
+// SJSBOX reader tests:
+//  - v1 per-record (AoS) and v2 column-wise (SoA) payloads load identically
+//    (float32/float64, with and without ids)
+//  - Header consistency checks: kSoA needs version 2 and vice versa
+//  - kBlosc payloads decode to the same relation (SJS_WITH_BLOSC builds) or
+//    are rejected with a clear error
+//  - The writer still emits version 1
+
+#include "sjs/core/types.h"
+#include "sjs/io/binary_io.h"
+
+#include <cstring>
+#include <filesystem>
+#include <fstream>
+#include <iostream>
+#include <string>
+#include <vector>
+
+namespace fs = std::filesystem;
+
+namespace {
+
+struct TestContext {
+  int fails = 0;
+
+  void Check(bool ok, const char* expr, const char* file, int line) {
+    if (ok) return;
+    ++fails;
+    std::cerr << "[FAIL] " << file << ":" << line << "  CHECK(" << expr << ")\n";
+  }
+};
+
+#define CHECK(ctx, expr) (ctx).Check((expr), #expr, __FILE__, __LINE__)
+
+constexpr int kDim = 2;
+constexpr sjs::u64 kCount = 5;
+
+// Coordinates are multiples of 1/4, so float32 and float64 files hold the
+// same values exactly.
+double Lo(sjs::u64 i, int d) { return 0.25 * static_cast<double>(i) + 0.5 * d; }
+double Hi(sjs::u64 i, int d) { return Lo(i, d) + 0.75; }
+sjs::Id FileId(sjs::u64 i) { return static_cast<sjs::Id>(100 + kCount - i); }
+
+template <class S>
+void Put(std::string& buf, S x) {
+  buf.append(reinterpret_cast<const char*>(&x), sizeof(x));
+}
+
+// Hand-writes an SJSBOX file; soa selects the payload layout independently of
+// the header's version/flags so inconsistent files can be produced too. The
+// payload always holds kCount records; header_count may disagree with it.
+// With kBlosc (in SJS_WITH_BLOSC builds) the payload is compressed in two
+// chunks, as the Python writer does per block of records.
+template <class S>
+void WriteRaw(const fs::path& path, sjs::u32 version, sjs::u32 flags, bool soa,
+              sjs::u64 header_count = kCount) {
+  sjs::binary::FileHeader h{};
+  std::memcpy(h.magic, sjs::binary::kMagic, sizeof(h.magic));
+  h.version = version;
+  h.dim = kDim;
+  h.scalar_bits = static_cast<sjs::u32>(sizeof(S) * 8);
+  h.flags = flags;
+  h.count = header_count;
+  h.endian = sjs::binary::kEndianMarker;
+
+  const std::string name = "R";
+  const bool ids = (flags & sjs::binary::kHasIds) != 0;
+
+  std::string payload;
+  if (soa) {
+    for (sjs::u64 i = 0; i < kCount; ++i)
+      for (int d = 0; d < kDim; ++d) Put(payload, static_cast<S>(Lo(i, d)));
+    for (sjs::u64 i = 0; i < kCount; ++i)
+      for (int d = 0; d < kDim; ++d) Put(payload, static_cast<S>(Hi(i, d)));
+    if (ids)
+      for (sjs::u64 i = 0; i < kCount; ++i) Put(payload, FileId(i));
+  } else {
+    for (sjs::u64 i = 0; i < kCount; ++i) {
+      for (int d = 0; d < kDim; ++d) Put(payload, static_cast<S>(Lo(i, d)));
+      for (int d = 0; d < kDim; ++d) Put(payload, static_cast<S>(Hi(i, d)));
+      if (ids) Put(payload, FileId(i));
+    }
+  }
+
+  std::string head(reinterpret_cast<const char*>(&h), sizeof(h));
+  Put(head, static_cast<sjs::u32>(name.size()));
+  head += name;
+
+  std::ofstream f(path, std::ios::binary);
+  f.write(head.data(), static_cast<std::streamsize>(head.size()));
+#ifdef SJS_HAVE_BLOSC
+  if ((flags & sjs::binary::kBlosc) != 0) {
+    const std::size_t split = 2 * (payload.size() / kCount);
+    for (const auto& [off, len] : {std::pair<std::size_t, std::size_t>{0, split},
+                                   std::pair<std::size_t, std::size_t>{split, payload.size() - split}}) {
+      std::vector<char> packed(len + BLOSC_MAX_OVERHEAD);
+      const int c = blosc_compress_ctx(5, BLOSC_SHUFFLE, sizeof(S), len, payload.data() + off,
+                                       packed.data(), packed.size(), "lz4", 0, 1);
+      std::string chunk;
+      Put(chunk, static_cast<sjs::u64>(c > 0 ? c : 0));
+      chunk.append(packed.data(), c > 0 ? static_cast<std::size_t>(c) : 0u);
+      f.write(chunk.data(), static_cast<std::streamsize>(chunk.size()));
+    }
+    return;
+  }
+#endif
+  f.write(payload.data(), static_cast<std::streamsize>(payload.size()));
+}
+
+using Rel = sjs::Relation<kDim, double>;
+
+bool Read(const fs::path& path, Rel* rel, sjs::binary::RelationFileInfo* info, std::string* err) {
+  return sjs::binary::ReadRelationBinary<kDim, double>(path.string(), rel, info, {}, err);
+}
+
+bool MatchesExpected(const Rel& rel, bool file_ids) {
+  if (rel.name != "R" || rel.boxes.size() != kCount || rel.ids.size() != kCount) return false;
+  for (sjs::u64 i = 0; i < kCount; ++i) {
+    const auto& b = rel.boxes[static_cast<sjs::usize>(i)];
+    for (int d = 0; d < kDim; ++d) {
+      if (b.lo.v[static_cast<sjs::usize>(d)] != Lo(i, d)) return false;
+      if (b.hi.v[static_cast<sjs::usize>(d)] != Hi(i, d)) return false;
+    }
+    const sjs::Id want = file_ids ? FileId(i) : static_cast<sjs::Id>(i);
+    if (rel.ids[static_cast<sjs::usize>(i)] != want) return false;
+  }
+  return true;
+}
+
+template <class S>
+void TestAoSMatchesSoA(TestContext& t, const fs::path& dir, bool ids) {
+  using namespace sjs::binary;
+  const sjs::u32 flags = kHalfOpen | (ids ? static_cast<sjs::u32>(kHasIds) : 0u);
+  const std::string tag = std::to_string(sizeof(S) * 8) + (ids ? "_ids" : "");
+  const fs::path aos = dir / ("aos_" + tag + ".bin");
+  const fs::path soa = dir / ("soa_" + tag + ".bin");
+  WriteRaw<S>(aos, kFormatVersionAoS, flags, /*soa=*/false);
+  WriteRaw<S>(soa, 2, flags | kSoA, /*soa=*/true);
+
+  Rel a, b;
+  RelationFileInfo ia, ib;
+  std::string ea, eb;
+  CHECK(t, Read(aos, &a, &ia, &ea));
+  CHECK(t, Read(soa, &b, &ib, &eb));
+  CHECK(t, ea.empty());
+  CHECK(t, eb.empty());
+  CHECK(t, ia.version == 1u);
+  CHECK(t, ib.version == 2u);
+  CHECK(t, MatchesExpected(a, ids));
+  CHECK(t, MatchesExpected(b, ids));
+}
+
+void ExpectRejected(TestContext& t, const fs::path& path, const char* needle) {
+  Rel rel;
+  std::string err;
+  CHECK(t, !Read(path, &rel, nullptr, &err));
+  CHECK(t, err.find(needle) != std::string::npos);
+}
+
+}  // namespace
+
+int main() {
+  using namespace sjs::binary;
+  TestContext t;
+
+  const fs::path tmp_root = fs::temp_directory_path() / "sjs_binary_io_test";
+  std::error_code ec;
+  fs::remove_all(tmp_root, ec);
+  fs::create_directories(tmp_root);
+
+  TestAoSMatchesSoA<float>(t, tmp_root, false);
+  TestAoSMatchesSoA<float>(t, tmp_root, true);
+  TestAoSMatchesSoA<double>(t, tmp_root, false);
+  TestAoSMatchesSoA<double>(t, tmp_root, true);
+
+  // kSoA on a version-1 file.
+  const fs::path soa_v1 = tmp_root / "soa_v1.bin";
+  WriteRaw<float>(soa_v1, kFormatVersionAoS, kHalfOpen | kSoA, /*soa=*/true);
+  ExpectRejected(t, soa_v1, "SoA layout flag does not match");
+
+  // Version 2 without kSoA.
+  const fs::path v2_aos = tmp_root / "v2_aos.bin";
+  WriteRaw<float>(v2_aos, 2, kHalfOpen, /*soa=*/false);
+  ExpectRejected(t, v2_aos, "SoA layout flag does not match");
+
+#ifdef SJS_HAVE_BLOSC
+  // Blosc-compressed payloads decode like plain v1 files.
+  for (bool ids : {false, true}) {
+    const sjs::u32 flags = kHalfOpen | kBlosc | (ids ? static_cast<sjs::u32>(kHasIds) : 0u);
+    const fs::path p32 = tmp_root / "blosc32.bin";
+    const fs::path p64 = tmp_root / "blosc64.bin";
+    WriteRaw<float>(p32, kFormatVersionAoS, flags, /*soa=*/false);
+    WriteRaw<double>(p64, kFormatVersionAoS, flags, /*soa=*/false);
+    Rel a, b;
+    std::string ea, eb;
+    CHECK(t, Read(p32, &a, nullptr, &ea));
+    CHECK(t, Read(p64, &b, nullptr, &eb));
+    CHECK(t, MatchesExpected(a, ids));
+    CHECK(t, MatchesExpected(b, ids));
+  }
+
+  // The decoded record count must match the header's count.
+  const fs::path blosc_short = tmp_root / "blosc_short.bin";
+  WriteRaw<float>(blosc_short, kFormatVersionAoS, kHalfOpen | kBlosc, /*soa=*/false, kCount - 1);
+  ExpectRejected(t, blosc_short, "Blosc chunk sizes do not match");
+  const fs::path blosc_long = tmp_root / "blosc_long.bin";
+  WriteRaw<float>(blosc_long, kFormatVersionAoS, kHalfOpen | kBlosc, /*soa=*/false, kCount + 1);
+  ExpectRejected(t, blosc_long, "unexpected EOF");
+
+  // Blosc is only defined for per-record payloads.
+  const fs::path blosc_soa = tmp_root / "blosc_soa.bin";
+  WriteRaw<float>(blosc_soa, 2, kHalfOpen | kSoA | kBlosc, /*soa=*/true);
+  ExpectRejected(t, blosc_soa, "only defined for per-record");
+#else
+  // Without c-blosc the header flag alone is enough to reject.
+  const fs::path blosc = tmp_root / "blosc.bin";
+  WriteRaw<float>(blosc, kFormatVersionAoS, kHalfOpen | kBlosc, /*soa=*/false);
+  ExpectRejected(t, blosc, "SJS_WITH_BLOSC");
+#endif
+
+  // Versions past kFormatVersion.
+  const fs::path v3 = tmp_root / "v3.bin";
+  WriteRaw<float>(v3, kFormatVersion + 1, kHalfOpen, /*soa=*/false);
+  ExpectRejected(t, v3, "Unsupported binary format version");
+
+  // The writer keeps emitting per-record version-1 files.
+  {
+    const fs::path src = tmp_root / "aos_64_ids.bin";
+    const fs::path dst = tmp_root / "written.bin";
+    Rel rel, back;
+    RelationFileInfo info;
+    std::string err;
+    CHECK(t, Read(src, &rel, nullptr, &err));
+    CHECK(t, (WriteRelationBinary<kDim, double>(dst.string(), rel, {}, &err)));
+    CHECK(t, Read(dst, &back, &info, &err));
+    CHECK(t, info.version == kFormatVersionAoS);
+    CHECK(t, (info.flags & kSoA) == 0u);
+    CHECK(t, MatchesExpected(back, /*file_ids=*/true));
+  }
+
+  fs::remove_all(tmp_root, ec);
+
+  if (t.fails == 0) {
+    std::cout << "[OK] test_binary_io\n";
+    return 0;
+  }
+  std::cerr << "[FAILED] test_binary_io: " << t.fails << " failure(s)\n";
+  return 1;
+}
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# tests/test_rectgen_sjsbox_io.py
+#
+# Tests for tools/alacarte_rectgen_generate.py:
+#  - SJSBOX writer/reader round trips (AoS, SoA, mmap and Blosc payloads)
+#  - CSV export: float32 values round-trip, float64 text is unchanged
+#  - NPY export: arrays map back with np.load(mmap_mode="r")
+#  - CLI argument validation
+#  - JSON report text is the same with or without orjson
+#
+# Exits 0 on pass, 1 on failure, 77 (CTest skip) if numpy is missing.
+# The Blosc cases are skipped with a note when python-blosc is missing.
+
+import contextlib
+import importlib.util
+import io
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+GEN_PATH = ROOT / "tools" / "alacarte_rectgen_generate.py"
+
+fails = 0
+
+
+def check(ok, expr):
+    global fails
+    if ok:
+        return
+    fails += 1
+    print(f"[FAIL] {expr}", file=sys.stderr)
+
+
+def load_gen():
+    spec = importlib.util.spec_from_file_location("alacarte_rectgen_generate", GEN_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    # Registered before exec so its dataclasses can resolve their module.
+    sys.modules[spec.name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def expect_value_error(fn, needle, label):
+    try:
+        fn()
+    except ValueError as ex:
+        check(needle in str(ex), f"{label}: error mentions {needle!r} (got {ex})")
+        return
+    check(False, f"{label}: raises ValueError")
+
+
+def run_cli(gen, argv):
+    # Returns (exit code, stderr text).
+    err = io.StringIO()
+    with contextlib.redirect_stderr(err):
+        code = gen.main(argv)
+    return code, err.getvalue()
+
+
+def old_csv_text(lower, upper, sep):
+    # The original per-row formatter, kept as the reference for float64 output.
+    d = lower.shape[1]
+    cols = ["id"] + [f"lo{i}" for i in range(d)] + [f"hi{i}" for i in range(d)]
+    lines = [sep.join(cols)]
+    for r in range(lower.shape[0]):
+        row = [str(r)] + [repr(float(x)) for x in lower[r]] + [repr(float(x)) for x in upper[r]]
+        lines.append(sep.join(row))
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    try:
+        import numpy as np
+    except ImportError:
+        print("[SKIP] test_rectgen_sjsbox_io: numpy not installed")
+        return 77
+
+    gen = load_gen()
+    try:
+        import blosc  # noqa: F401
+
+        have_blosc = True
+    except ImportError:
+        have_blosc = False
+
+    tmp = Path(tempfile.mkdtemp(prefix="sjs_rectgen_io_test_"))
+    try:
+        rng = np.random.default_rng(7)
+        n, d = 1003, 3
+        lower = rng.random((n, d))
+        upper = lower + rng.random((n, d))
+
+        cases = [
+            ("aos", False, "none"),
+            ("soa", False, "none"),
+            ("aos", True, "none"),
+            ("soa", True, "none"),
+        ]
+        if have_blosc:
+            cases.append(("aos", False, "blosc"))
+
+        for layout, mmap_write, compression in cases:
+            for scalar_bits in (32, 64):
+                for write_ids in (False, True):
+                    label = f"{layout}/mmap={mmap_write}/{compression}/f{scalar_bits}/ids={write_ids}"
+                    path = tmp / "rel.bin"
+                    # Small chunks so every layout sees several write_chunk calls
+                    # (and Blosc output holds several compressed chunks).
+                    gen.write_sjsbox_relation(
+                        str(path),
+                        lower,
+                        upper,
+                        name="R",
+                        scalar_bits=scalar_bits,
+                        write_ids=write_ids,
+                        chunk_rows=256,
+                        compression=compression,
+                        layout=layout,
+                        mmap_write=mmap_write,
+                    )
+                    rel = gen.read_sjsbox_relation(str(path))
+                    dt = np.float32 if scalar_bits == 32 else np.float64
+                    check(rel.name == "R", f"{label}: name")
+                    check(rel.version == (2 if layout == "soa" else 1), f"{label}: version")
+                    check(rel.lower.dtype == dt, f"{label}: dtype")
+                    check(np.array_equal(rel.lower, lower.astype(dt)), f"{label}: lower")
+                    check(np.array_equal(rel.upper, upper.astype(dt)), f"{label}: upper")
+                    if write_ids:
+                        check(
+                            rel.ids is not None and np.array_equal(rel.ids, np.arange(n, dtype=np.uint32)),
+                            f"{label}: ids",
+                        )
+                    else:
+                        check(rel.ids is None, f"{label}: no ids")
+
+        # CSV: awkward values (exponent forms, subnormals, extremes) next to
+        # random ones, written in small chunks so ids continue across them.
+        special = np.array(
+            [[0.0, -0.0, 1e-05], [1e16, 0.1, 1.0 / 3.0], [5e-324, 1.7976931348623157e308, -2.5e-10]]
+        )
+        lo64 = np.vstack([special, lower])
+        hi64 = np.vstack([special + 0.5, upper])
+
+        path = tmp / "rel64.csv"
+        gen.write_relation_csv(str(path), lo64, hi64, chunk_rows=100)
+        check(path.read_text() == old_csv_text(lo64, hi64, ","), "csv f64: text matches repr(float(x))")
+
+        f32 = np.finfo(np.float32)
+        special32 = np.array(
+            [[0.0, -0.0, 1e-05], [1e16, 0.1, 1.0 / 3.0], [f32.tiny / 8, float(f32.max), -2.5e-10]], dtype=np.float32
+        )
+        lo32 = np.vstack([special32, lower.astype(np.float32)])
+        hi32 = np.vstack([special32 + np.float32(0.5), upper.astype(np.float32)])
+        for sep_arg, sep_ch in ((",", ","), ("tab", "\t"), ("\\t", "\t")):
+            path = tmp / "rel32.csv"
+            gen.write_relation_csv(str(path), lo32, hi32, sep=sep_arg, chunk_rows=100)
+            lines = path.read_text().splitlines()
+            label = f"csv f32 sep={sep_arg!r}"
+            check(lines[0] == sep_ch.join(["id", "lo0", "lo1", "lo2", "hi0", "hi1", "hi2"]), f"{label}: header")
+            rows = [line.split(sep_ch) for line in lines[1:]]
+            check(all(len(row) == 7 for row in rows), f"{label}: column count")
+            check([int(row[0]) for row in rows] == list(range(lo32.shape[0])), f"{label}: ids")
+            vals = np.array([[float(x) for x in row[1:]] for row in rows]).astype(np.float32)
+            check(np.array_equal(vals[:, :3], lo32), f"{label}: lower round-trips exactly")
+            check(np.array_equal(vals[:, 3:], hi32), f"{label}: upper round-trips exactly")
+        expect_value_error(
+            lambda: gen.write_relation_csv(str(tmp / "bad.csv"), lo32, hi32, sep=";;"), "single character", "csv sep"
+        )
+
+        # NPY: a Fortran-ordered float64 source still yields C-ordered,
+        # mmap-able files of the requested dtype.
+        lower_f = np.asfortranarray(lower)
+        for scalar_bits in (32, 64):
+            dt = np.dtype("<f4") if scalar_bits == 32 else np.dtype("<f8")
+            base = str(tmp / "npy" / f"rel{scalar_bits}")
+            paths = gen.write_relation_npy(base, lower_f, upper, scalar_bits=scalar_bits)
+            check(paths == (base + ".lower.npy", base + ".upper.npy"), f"npy f{scalar_bits}: paths")
+            for out_path, src in zip(paths, (lower, upper)):
+                arr = np.load(out_path, mmap_mode="r")
+                label = f"npy f{scalar_bits} {os.path.basename(out_path)}"
+                check(isinstance(arr, np.memmap), f"{label}: memory-mapped")
+                check(arr.dtype == dt and arr.shape == (n, d), f"{label}: dtype/shape")
+                check(arr.flags.c_contiguous and arr.offset % 64 == 0, f"{label}: C order, 64-byte aligned data")
+                check(np.array_equal(arr, src.astype(dt)), f"{label}: values")
+                del arr
+        expect_value_error(
+            lambda: gen.write_relation_npy(str(tmp / "bad"), lower, upper, scalar_bits=16), "scalar_bits", "npy bits"
+        )
+        expect_value_error(
+            lambda: gen.write_relation_npy(str(tmp / "bad"), lower, upper[:-1]), "same shape", "npy shape"
+        )
+
+        # The report's text must not depend on whether orjson is installed.
+        reports = [{"b": 0.5, "l": [1, 2]}, {"p_hat": 1e-05, "x": 1e16}, {"eps": float("nan")}]
+        orjson_mod = gen.orjson
+        for indent in (False, True):
+            for report in reports:
+                with_orjson = gen._report_json(report, indent=indent)
+                gen.orjson = None
+                try:
+                    without = gen._report_json(report, indent=indent)
+                finally:
+                    gen.orjson = orjson_mod
+                check(with_orjson == without, f"report json indent={indent}: {report}")
+
+        # CLI validation fails fast with exit code 2 (before any generation).
+        cli = ["--nR", "10", "--nS", "10", "--d", "2", "--alpha_out", "1"]
+        cli += ["--out_r", str(tmp / "cli_r.bin"), "--out_s", str(tmp / "cli_s.bin")]
+        for workers in ("0", "-3"):
+            code, err = run_cli(gen, cli + ["--audit_workers", workers])
+            check(code == 2 and "audit_workers must be >= 1" in err, f"cli: --audit_workers {workers} rejected")
+
+        # out_r and out_s naming one file (directly, via "..", a symlink or a
+        # hard link) would have both writer threads truncate and fill it.
+        same = tmp / "same.bin"
+        same.write_bytes(b"")
+        (tmp / "sub").mkdir()
+        os.symlink(same, tmp / "sym.bin")
+        os.link(same, tmp / "hard.bin")
+        for alias in (same, tmp / "sub" / ".." / "same.bin", tmp / "sym.bin", tmp / "hard.bin"):
+            code, err = run_cli(gen, cli[:-4] + ["--out_r", str(same), "--out_s", str(alias)])
+            check(code == 2 and "out_r and out_s must be different" in err, f"cli: out_s={alias} rejected")
+
+        # A header n that disagrees with the payload must be rejected.
+        count_offset = 8 + 4 * 4  # magic, then version/dim/scalar_bits/flags
+        bad_cases = [("none", "expected")]
+        if have_blosc:
+            bad_cases.append(("blosc", "header declares n="))
+        for compression, needle in bad_cases:
+            path = tmp / f"bad_{compression}.bin"
+            gen.write_sjsbox_relation(str(path), lower, upper, chunk_rows=256, compression=compression)
+            with open(path, "r+b") as f:
+                f.seek(count_offset)
+                f.write((n + 1).to_bytes(8, "little"))
+            expect_value_error(lambda: gen.read_sjsbox_relation(str(path)), needle, f"bad n/{compression}")
+
+        # A truncated Blosc stream must be rejected, not silently shortened.
+        if have_blosc:
+            path = tmp / "trunc.bin"
+            gen.write_sjsbox_relation(str(path), lower, upper, chunk_rows=256, compression="blosc")
+            with open(path, "r+b") as f:
+                f.truncate(os.path.getsize(path) - 3)
+            expect_value_error(lambda: gen.read_sjsbox_relation(str(path)), "truncated", "truncated blosc")
+        else:
+            print("[NOTE] python-blosc not installed; Blosc cases skipped")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if fails == 0:
+        print("[OK] test_rectgen_sjsbox_io")
+        return 0
+    print(f"[FAILED] test_rectgen_sjsbox_io: {fails} failure(s)", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,7 @@
 
 Generate controllable output-density synthetic axis-aligned hyper-rectangles
 using the local `Alacarte/alacarte_rectgen.py` source in this repository, then
-export to the SJS-HighDims binary format (SJSBOX v1).
+export to the SJS-HighDims binary format (SJSBOX v1; v2 with --layout soa).
 
 This is meant to be the *single source of truth* for synthetic dataset
 generation in this repo when you choose:
@@ -25,8 +25,10 @@ It also performs a generation quality audit:
 
 Outputs
 -------
-Writes two binary relation files (R and S) in SJSBOX v1 format.
+Writes two binary relation files (R and S) in SJSBOX format: v1 per-record
+payloads by default, v2 column-wise (SoA) payloads with --layout soa.
 Optionally writes CSV files for debugging.
+Optionally writes NPY lower/upper arrays (--write_npy) for mmap-based tooling.
 Always writes a JSON report (if --report_path is provided).
 
 Binary format note
@@ -41,22 +43,40 @@ from __future__ import annotations
 
 import argparse
 import json
+import math
+import mmap
 import os
 import struct
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import importlib.util
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 
+# numpy is needed for every real code path, but a missing install should
+# surface as a clear error from the function that needs it (or a FATAL
+# line from main), not as an ImportError at load time.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Optional faster JSON encoder for the report (see _report_json).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 def _eprint(*args: Any) -> None:
     print(*args, file=sys.stderr)
 
 
 # ----------------------------
-# SJSBOX v1 binary writer
+# SJSBOX binary writer (v1 AoS, v2 SoA)
 # ----------------------------
 
 
@@ -69,6 +89,61 @@ class SJSBoxHeader:
 
 FLAG_HALF_OPEN = 1 << 0
 FLAG_HAS_IDS = 1 << 1
+FLAG_BLOSC = 1 << 2
+FLAG_SOA = 1 << 3
+
+# SoA files are written as version 2 so that v1-only readers reject them
+# instead of misreading the payload; AoS files stay version 1.
+SJSBOX_VERSION_SOA = 2
+
+# Header = magic | version, d, scalar_bits, flags, n | endian marker, reserved[4].
+# Only the middle varies per file, so the rest is packed once at import.
+_HDR_HEAD = SJSBoxHeader.magic
+_HDR_MID = struct.Struct("<IIIIQ")
+_HDR_TAIL = struct.pack("<QQQQQ", SJSBoxHeader.endian_marker, 0, 0, 0, 0)
+
+
+# Optional numba kernel for the AoS interleave (see _fused_lohi_kernel).
+# None = not tried yet, False = numba unavailable. The lock keeps the R and
+# S writer threads from racing to import numba / build the kernel.
+# Opt-in only (numba_interleave=True): importing numba and loading the cached
+# kernel costs ~0.3 s per process, which the copy saves back only from
+# roughly 40M rows at d=2.
+_FUSE_LOHI: Any = None
+_FUSE_LOHI_LOCK = threading.Lock()
+_FUSE_MIN_ELEMS = 10_000_000
+
+
+def _fused_lohi_kernel():
+    """Return a numba kernel that fills out[:, :d] and out[:, d:] in one pass.
+
+    The NumPy path does two strided copies (lower, then upper); the fused
+    loop reads each input once and writes each output row once. Returns None
+    when numba is not installed; compiled lazily and cached on disk (numba
+    puts the cache files in __pycache__ next to this script unless
+    NUMBA_CACHE_DIR is set).
+    """
+    global _FUSE_LOHI
+    with _FUSE_LOHI_LOCK:
+        if _FUSE_LOHI is None:
+            try:
+                import numba
+            except Exception:
+                _FUSE_LOHI = False
+            else:
+                # Serial and nogil on purpose: main() already writes R and S
+                # from two threads, and numba's parallel threading layers are
+                # not safe to enter from several Python threads at once.
+                @numba.njit(nogil=True, boundscheck=False, cache=True)
+                def fuse_lohi(lower, upper, out):
+                    m, d = lower.shape
+                    for r in range(m):
+                        for k in range(d):
+                            out[r, k] = lower[r, k]
+                            out[r, d + k] = upper[r, k]
+
+                _FUSE_LOHI = fuse_lohi
+    return _FUSE_LOHI or None
 
 
 def _ensure_parent_dir(path: str) -> None:
@@ -77,6 +152,329 @@ def _ensure_parent_dir(path: str) -> None:
         os.makedirs(parent, exist_ok=True)
 
 
+def _same_file(a: str, b: str) -> bool:
+    """True if paths a and b name the same file (symlinks and hard links too)."""
+    if os.path.realpath(a) == os.path.realpath(b):
+        return True
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False  # at least one does not exist yet
+
+
+def _drop_page_cache(path: str) -> None:
+    """Flush `path` and advise the kernel to evict its cached pages.
+
+    Best effort (no-op where posix_fadvise is unavailable). fdatasync comes
+    first because POSIX_FADV_DONTNEED does not drop dirty pages.
+    """
+    if not path or not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class SJSBoxChunkWriter:
+    """Incremental SJSBOX writer; create it with write_sjsbox_open().
+
+    The header (including the record count n) is written on construction,
+    then records are appended with write_chunk(). close() verifies that
+    exactly n records were written.
+
+    With layout="soa" the payload is [lower (n, d)][upper (n, d)][ids (n,)]
+    instead of per-row records; chunks are placed by seeking, which is
+    possible because n is fixed up front.
+
+    With mmap_write=True the file is sized up front and mapped, and chunks
+    are assigned straight into NumPy views of the mapping (no staging
+    buffer, no write() calls; the kernel does the writeback).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        n: int,
+        d: int,
+        *,
+        name: str = "",
+        scalar_bits: int = 32,
+        half_open: bool = True,
+        write_ids: bool = False,
+        compression: str = "none",
+        layout: str = "aos",
+        mmap_write: bool = False,
+        numba_interleave: bool = False,
+    ) -> None:
+        if np is None:
+            raise RuntimeError("numpy is required to write SJSBOX files")
+
+        if n < 0:
+            raise ValueError("record count n must be >= 0")
+        if d <= 0:
+            raise ValueError("dimension d must be > 0")
+
+        if scalar_bits == 32:
+            dt = np.dtype("<f4")
+        elif scalar_bits == 64:
+            dt = np.dtype("<f8")
+        else:
+            raise ValueError("scalar_bits must be 32 or 64")
+
+        if compression not in ("none", "blosc"):
+            raise ValueError("compression must be 'none' or 'blosc'")
+        blosc = None
+        if compression == "blosc":
+            try:
+                import blosc
+            except Exception as ex:
+                raise RuntimeError("python-blosc is required for compression='blosc'") from ex
+
+        if layout not in ("aos", "soa"):
+            raise ValueError("layout must be 'aos' or 'soa'")
+        soa = layout == "soa"
+        if soa and blosc is not None:
+            raise ValueError("layout='soa' does not support compression")
+        if mmap_write and blosc is not None:
+            raise ValueError("mmap_write does not support compression")
+
+        flags = 0
+        if half_open:
+            flags |= FLAG_HALF_OPEN
+        if write_ids:
+            flags |= FLAG_HAS_IDS
+        if blosc is not None:
+            flags |= FLAG_BLOSC
+        if soa:
+            flags |= FLAG_SOA
+
+        version = SJSBOX_VERSION_SOA if soa else SJSBoxHeader.version
+        hdr_bytes = _HDR_HEAD + _HDR_MID.pack(version, int(d), int(scalar_bits), int(flags), int(n)) + _HDR_TAIL
+        name_bytes = name.encode("utf-8")
+        if len(name_bytes) > 2**32 - 1:
+            raise ValueError("relation name too long")
+
+        self._n = int(n)
+        self._d = int(d)
+        self._dt = dt
+        self._write_ids = bool(write_ids)
+        self._blosc = blosc
+        self._soa = soa
+        self._written = 0
+        self._stage = None
+        self._id_base = None
+        self._id_scratch = None
+        self._mm = None
+        self._mm_views: Tuple[Any, ...] = ()
+        # Opt-in, and only for large id-less AoS payloads (see _FUSE_LOHI).
+        self._fuse = None
+        if numba_interleave and not write_ids and not soa and n * d >= _FUSE_MIN_ELEMS:
+            self._fuse = _fused_lohi_kernel()
+
+        # Blosc caps a single buffer at MAX_BUFFERSIZE bytes.
+        self._max_rows = 0
+        if blosc is not None:
+            rec_bytes = 2 * d * dt.itemsize + (4 if write_ids else 0)
+            self._max_rows = max(1, blosc.MAX_BUFFERSIZE // rec_bytes)
+
+        _ensure_parent_dir(path)
+        # A shared mapping needs a read/write descriptor.
+        self._f = open(path, "w+b" if mmap_write else "wb")
+        try:
+            # Header, name length and name go out in a single write.
+            head = bytearray(hdr_bytes)
+            head += struct.pack("<I", len(name_bytes))
+            head += name_bytes
+            self._f.write(head)
+            self._payload_start = self._f.tell()
+            if mmap_write:
+                self._map_payload()
+        except BaseException:
+            self._release()
+            raise
+
+    def __enter__(self) -> "SJSBoxChunkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._release()
+
+    def write_chunk(self, lower, upper) -> None:
+        """Append records; lower/upper are shaped (m, d)."""
+        lower = np.asarray(lower)
+        upper = np.asarray(upper)
+        if lower.ndim != 2 or lower.shape != upper.shape or lower.shape[1] != self._d:
+            raise ValueError(
+                f"chunk must be two ({self._d}-column) 2D arrays of equal shape; "
+                f"got {lower.shape} vs {upper.shape}"
+            )
+        m = int(lower.shape[0])
+        if self._written + m > self._n:
+            raise ValueError(f"chunk exceeds declared record count n={self._n}")
+        if m == 0:
+            return
+
+        step = self._max_rows or m
+        for i in range(0, m, step):
+            j = min(m, i + step)
+            self._write_block(lower[i:j], upper[i:j])
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self._release()
+        if self._written != self._n:
+            raise ValueError(f"SJSBOX header declares n={self._n} but {self._written} records were written")
+
+    def _write_block(self, lower, upper) -> None:
+        # Record layout per row: [lo_0..lo_{d-1}, hi_0..hi_{d-1}] (+ optional id).
+        # One staging buffer is reused across chunks (grown only if a larger
+        # chunk arrives), and its prefix is handed to the file as a memoryview
+        # (tobytes() would copy again).
+        d = self._d
+        m = int(lower.shape[0])
+        if self._mm is not None:
+            self._write_block_mmap(lower, upper)
+            return
+        if self._soa:
+            self._write_block_soa(lower, upper)
+            return
+        if self._stage is None or self._stage.shape[0] < m:
+            if self._write_ids:
+                # A packed structured dtype matches the on-disk record exactly
+                # (lo/hi floats followed by a u32 id, no padding).
+                rec_dt = np.dtype([("lohi", self._dt, (2 * d,)), ("id", "<u4")])
+                self._stage = np.empty(m, dtype=rec_dt)
+            else:
+                self._stage = np.empty((m, 2 * d), dtype=self._dt)
+
+        if self._write_ids:
+            lohi = self._stage["lohi"]
+            lohi[:m, :d] = lower
+            lohi[:m, d:] = upper
+            self._fill_ids(self._stage["id"][:m])
+        elif self._fuse is not None and lower.dtype == self._dt and upper.dtype == self._dt:
+            self._fuse(lower, upper, self._stage[:m])
+        else:
+            self._stage[:m, :d] = lower
+            self._stage[:m, d:] = upper
+        buf = memoryview(self._stage[:m]).cast("B")
+
+        if self._blosc is None:
+            self._f.write(buf)
+        else:
+            packed = self._blosc.compress(
+                buf, typesize=self._dt.itemsize, cname="lz4", shuffle=self._blosc.SHUFFLE
+            )
+            self._f.write(struct.pack("<Q", len(packed)))
+            self._f.write(packed)
+        self._written += m
+
+    def _write_block_soa(self, lower, upper) -> None:
+        m = int(lower.shape[0])
+        row_bytes = self._d * self._dt.itemsize
+        base = self._payload_start
+        f = self._f
+
+        f.seek(base + self._written * row_bytes)
+        f.write(memoryview(np.ascontiguousarray(lower, dtype=self._dt)).cast("B"))
+        f.seek(base + (self._n + self._written) * row_bytes)
+        f.write(memoryview(np.ascontiguousarray(upper, dtype=self._dt)).cast("B"))
+        if self._write_ids:
+            if self._id_scratch is None or self._id_scratch.shape[0] < m:
+                self._id_scratch = np.empty(m, dtype="<u4")
+            ids = self._id_scratch[:m]
+            self._fill_ids(ids)
+            f.seek(base + 2 * self._n * row_bytes + self._written * 4)
+            f.write(memoryview(ids).cast("B"))
+        self._written += m
+
+    def _map_payload(self) -> None:
+        n, d, dt = self._n, self._d, self._dt
+        rec_bytes = 2 * d * dt.itemsize + (4 if self._write_ids else 0)
+        if n == 0:
+            return  # nothing to map (and mmap rejects zero-length maps)
+        total = self._payload_start + n * rec_bytes
+        self._f.flush()
+        os.ftruncate(self._f.fileno(), total)
+        self._mm = mmap.mmap(self._f.fileno(), total)
+        base = self._payload_start
+        if self._soa:
+            block = n * d * dt.itemsize
+            views = [
+                np.frombuffer(self._mm, dtype=dt, count=n * d, offset=base).reshape(n, d),
+                np.frombuffer(self._mm, dtype=dt, count=n * d, offset=base + block).reshape(n, d),
+            ]
+            if self._write_ids:
+                views.append(np.frombuffer(self._mm, dtype="<u4", count=n, offset=base + 2 * block))
+            self._mm_views = tuple(views)
+        elif self._write_ids:
+            rec_dt = np.dtype([("lohi", dt, (2 * d,)), ("id", "<u4")])
+            self._mm_views = (np.frombuffer(self._mm, dtype=rec_dt, count=n, offset=base),)
+        else:
+            self._mm_views = (np.frombuffer(self._mm, dtype=dt, count=n * 2 * d, offset=base).reshape(n, 2 * d),)
+
+    def _write_block_mmap(self, lower, upper) -> None:
+        d = self._d
+        i = self._written
+        j = i + int(lower.shape[0])
+        if self._soa:
+            self._mm_views[0][i:j] = lower
+            self._mm_views[1][i:j] = upper
+            if self._write_ids:
+                self._fill_ids(self._mm_views[2][i:j])
+        elif self._write_ids:
+            rec = self._mm_views[0]
+            rec["lohi"][i:j, :d] = lower
+            rec["lohi"][i:j, d:] = upper
+            self._fill_ids(rec["id"][i:j])
+        elif self._fuse is not None and lower.dtype == self._dt and upper.dtype == self._dt:
+            self._fuse(lower, upper, self._mm_views[0][i:j])
+        else:
+            self._mm_views[0][i:j, :d] = lower
+            self._mm_views[0][i:j, d:] = upper
+        self._written = j
+
+    def _release(self) -> None:
+        # The NumPy views export the mapping's buffer; drop them before
+        # closing it, or mmap.close() raises BufferError.
+        self._mm_views = ()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+    def _fill_ids(self, out) -> None:
+        # ids of the next len(out) records = written + [0, m), computed as one
+        # in-place add from a cached 0..m-1 ramp (no per-chunk arange).
+        m = out.shape[0]
+        if self._id_base is None or self._id_base.shape[0] < m:
+            self._id_base = np.arange(m, dtype="<u4")
+        np.add(self._id_base[:m], np.uint32(self._written), out=out)
+
+
+def write_sjsbox_open(path: str, n: int, d: int, **kwargs: Any) -> SJSBoxChunkWriter:
+    """Open an SJSBOX file for streaming writes of n records.
+
+    Accepts the same keyword options as write_sjsbox_relation (except
+    chunk_rows). Use it when records are produced in blocks, so the full
+    relation never has to be resident at once:
+
+        with write_sjsbox_open(path, n, d, name="R") as w:
+            for lo, hi in blocks:
+                w.write_chunk(lo, hi)
+    """
+    return SJSBoxChunkWriter(path, n, d, **kwargs)
+
+
 def write_sjsbox_relation(
     path: str,
     lower,
@@ -87,8 +485,12 @@ def write_sjsbox_relation(
     half_open: bool = True,
     write_ids: bool = False,
     chunk_rows: int = 1_000_000,
+    compression: str = "none",
+    layout: str = "aos",
+    mmap_write: bool = False,
+    numba_interleave: bool = False,
 ) -> None:
-    """Write one relation in SJSBOX v1 format.
+    """Write one relation in SJSBOX format (v1, or v2 for layout="soa").
 
     Parameters
     ----------
@@ -97,14 +499,30 @@ def write_sjsbox_relation(
     write_ids
         If True, writes an explicit u32 id per record.
         NOTE: Writing ids requires per-record interleaving (lo/hi/id), which
-        makes streaming slower. This repo generally doesn't need explicit ids
+        makes files larger. This repo generally doesn't need explicit ids
         in files.
+    compression
+        "none" (default) or "blosc". With "blosc", each chunk of records is
+        byte-shuffled and compressed (lz4) and written as
+        [u64 compressed_len][compressed bytes], and FLAG_BLOSC is set.
+        Requires python-blosc. Read it back with read_sjsbox_relation(), or
+        in C++ with a build configured with -DSJS_WITH_BLOSC=ON (other
+        builds reject such files).
+    layout
+        "aos" (default): per-row [lo.., hi..] records, SJSBOX v1.
+        "soa": all lowers, then all uppers (then ids), SJSBOX v2 with
+        FLAG_SOA, so single-bound scans read contiguous memory.
+    mmap_write
+        Fill the payload through a memory map of the pre-sized file instead
+        of write() calls (uncompressed output only).
+    numba_interleave
+        Interleave lower/upper with a numba kernel for id-less AoS payloads
+        of at least 10M scalars. Off by default: the numba import and kernel
+        load cost more than the copy saves below roughly 40M rows at d=2.
     """
 
-    try:
-        import numpy as np
-    except Exception as ex:
-        raise RuntimeError("numpy is required to write SJSBOX files") from ex
+    if np is None:
+        raise RuntimeError("numpy is required to write SJSBOX files")
 
     lower = np.asarray(lower)
     upper = np.asarray(upper)
@@ -117,80 +535,143 @@ def write_sjsbox_relation(
     if d <= 0:
         raise ValueError("dimension d must be > 0")
 
-    if scalar_bits == 32:
-        dt = np.dtype("<f4")
-    elif scalar_bits == 64:
-        dt = np.dtype("<f8")
-    else:
-        raise ValueError("scalar_bits must be 32 or 64")
+    # No up-front cast to the output dtype: the chunk writer converts one
+    # chunk at a time while staging it, so a float64 or non-contiguous input
+    # never costs a second full-size copy (and a matching float32 C array is
+    # only ever read).
+    # For performance and memory, write in chunks.
+    if chunk_rows <= 0:
+        chunk_rows = 1_000_000
+
+    with write_sjsbox_open(
+        path,
+        n,
+        d,
+        name=name,
+        scalar_bits=scalar_bits,
+        half_open=half_open,
+        write_ids=write_ids,
+        compression=compression,
+        layout=layout,
+        mmap_write=mmap_write,
+        numba_interleave=numba_interleave,
+    ) as w:
+        for i in range(0, n, chunk_rows):
+            j = min(n, i + chunk_rows)
+            w.write_chunk(lower[i:j], upper[i:j])
 
-    # Ensure contiguous little-endian floats.
-    lower = np.ascontiguousarray(lower, dtype=dt)
-    upper = np.ascontiguousarray(upper, dtype=dt)
-
-    flags = 0
-    if half_open:
-        flags |= FLAG_HALF_OPEN
-    if write_ids:
-        flags |= FLAG_HAS_IDS
-
-    header = SJSBoxHeader()
-    hdr_bytes = struct.pack(
-        "<8sIIIIQQQQQQ",
-        header.magic,
-        header.version,
-        int(d),
-        int(scalar_bits),
-        int(flags),
-        int(n),
-        header.endian_marker,
-        0,
-        0,
-        0,
-        0,
-    )
-    name_bytes = name.encode("utf-8")
-    if len(name_bytes) > 2**32 - 1:
-        raise ValueError("relation name too long")
 
-    _ensure_parent_dir(path)
-    with open(path, "wb") as f:
-        f.write(hdr_bytes)
-        f.write(struct.pack("<I", len(name_bytes)))
-        if name_bytes:
-            f.write(name_bytes)
-
-        # Record layout per row: [lo_0..lo_{d-1}, hi_0..hi_{d-1}] (+ optional id)
-        # For performance and memory, write in chunks.
-        if chunk_rows <= 0:
-            chunk_rows = 1_000_000
+@dataclass(frozen=True)
+class SJSBoxRelation:
+    name: str
+    lower: Any  # (n, d) array
+    upper: Any  # (n, d) array
+    ids: Any  # (n,) u32 array, or None if the file has no ids
+    version: int
+    flags: int
+
+
+def read_sjsbox_relation(path: str) -> SJSBoxRelation:
+    """Read an SJSBOX file written by this module.
+
+    Decodes every variant the writer produces: v1 per-row records, v2 SoA
+    blocks, and Blosc-compressed payloads (a sequence of
+    [u64 compressed_len][compressed bytes] chunks, which requires
+    python-blosc). Raises ValueError on a malformed file, including a
+    payload whose record count does not match the header's n.
+    """
 
-        if write_ids:
-            # Interleaving ids with floats is necessary. We support it, but it is
-            # intentionally not the default.
-            id_dt = np.dtype("<u4")
-            for i in range(0, n, chunk_rows):
-                j = min(n, i + chunk_rows)
-                m = j - i
-                inter = np.empty((m, 2 * d), dtype=dt)
-                inter[:, :d] = lower[i:j]
-                inter[:, d:] = upper[i:j]
-                ids = np.arange(i, j, dtype=id_dt)
-
-                # Write record-by-record (still chunked to keep peak memory bounded).
-                # This is slower than the no-id path, but correct.
-                for r in range(m):
-                    f.write(inter[r].tobytes(order="C"))
-                    f.write(ids[r].tobytes(order="C"))
+    if np is None:
+        raise RuntimeError("numpy is required to read SJSBOX files")
+
+    hdr_size = len(_HDR_HEAD) + _HDR_MID.size + len(_HDR_TAIL)
+    with open(path, "rb") as f:
+        hdr = f.read(hdr_size)
+        if len(hdr) != hdr_size:
+            raise ValueError("truncated SJSBOX header")
+        if hdr[: len(_HDR_HEAD)] != _HDR_HEAD:
+            raise ValueError("bad magic header (not an SJSBOX file)")
+        version, d, scalar_bits, flags, n = _HDR_MID.unpack_from(hdr, len(_HDR_HEAD))
+        (endian,) = struct.unpack_from("<Q", hdr, len(_HDR_HEAD) + _HDR_MID.size)
+        if endian != SJSBoxHeader.endian_marker:
+            raise ValueError("endianness marker mismatch")
+        if version not in (SJSBoxHeader.version, SJSBOX_VERSION_SOA):
+            raise ValueError(f"unsupported SJSBOX version: {version}")
+        soa = bool(flags & FLAG_SOA)
+        if soa != (version == SJSBOX_VERSION_SOA):
+            raise ValueError(f"SoA layout flag does not match SJSBOX version {version}")
+        if scalar_bits not in (32, 64):
+            raise ValueError(f"unsupported scalar_bits: {scalar_bits}")
+        if d <= 0:
+            raise ValueError("dimension d must be > 0")
+
+        name_len_raw = f.read(4)
+        if len(name_len_raw) != 4:
+            raise ValueError("truncated SJSBOX name length")
+        (name_len,) = struct.unpack("<I", name_len_raw)
+        name_raw = f.read(name_len)
+        if len(name_raw) != name_len:
+            raise ValueError("truncated SJSBOX name")
+        payload = f.read()
+
+    dt = np.dtype("<f4") if scalar_bits == 32 else np.dtype("<f8")
+    has_ids = bool(flags & FLAG_HAS_IDS)
+    rec_bytes = 2 * d * dt.itemsize + (4 if has_ids else 0)
+
+    if flags & FLAG_BLOSC:
+        try:
+            import blosc
+        except Exception as ex:
+            raise RuntimeError("python-blosc is required to read Blosc-compressed SJSBOX files") from ex
+        view = memoryview(payload)
+        parts = []
+        rows = 0
+        pos = 0
+        while pos < len(view):
+            if pos + 8 > len(view):
+                raise ValueError("truncated Blosc chunk length")
+            (clen,) = struct.unpack_from("<Q", view, pos)
+            pos += 8
+            if pos + clen > len(view):
+                raise ValueError("truncated Blosc chunk")
+            block = blosc.decompress(view[pos : pos + clen])
+            pos += clen
+            if len(block) % rec_bytes != 0:
+                raise ValueError("Blosc chunk does not hold a whole number of records")
+            rows += len(block) // rec_bytes
+            parts.append(block)
+        if rows != n:
+            raise ValueError(f"Blosc payload decodes to {rows} records but header declares n={n}")
+        payload = b"".join(parts)
+
+    if len(payload) != n * rec_bytes:
+        raise ValueError(f"payload is {len(payload)} bytes; expected {n * rec_bytes} for n={n}")
+
+    ids = None
+    if soa:
+        block = n * d * dt.itemsize
+        lower = np.frombuffer(payload, dtype=dt, count=n * d).reshape(n, d)
+        upper = np.frombuffer(payload, dtype=dt, count=n * d, offset=block).reshape(n, d)
+        if has_ids:
+            ids = np.frombuffer(payload, dtype="<u4", count=n, offset=2 * block)
+    else:
+        if has_ids:
+            rec = np.frombuffer(payload, dtype=np.dtype([("lohi", dt, (2 * d,)), ("id", "<u4")]), count=n)
+            lohi = rec["lohi"]
+            ids = np.ascontiguousarray(rec["id"])
         else:
-            # Fast path: write only floats (no ids), fully vectorized.
-            for i in range(0, n, chunk_rows):
-                j = min(n, i + chunk_rows)
-                m = j - i
-                inter = np.empty((m, 2 * d), dtype=dt)
-                inter[:, :d] = lower[i:j]
-                inter[:, d:] = upper[i:j]
-                f.write(inter.tobytes(order="C"))
+            lohi = np.frombuffer(payload, dtype=dt, count=n * 2 * d).reshape(n, 2 * d)
+        lower = np.ascontiguousarray(lohi[:, :d])
+        upper = np.ascontiguousarray(lohi[:, d:])
+
+    return SJSBoxRelation(
+        name=name_raw.decode("utf-8"),
+        lower=lower,
+        upper=upper,
+        ids=ids,
+        version=int(version),
+        flags=int(flags),
+    )
 
 
 def write_relation_csv(
@@ -206,12 +687,14 @@ def write_relation_csv(
 
     Format matches sjs/io/csv_io.h expectations:
       id, lo0..lo(d-1), hi0..hi(d-1)
+
+    float32 coordinates are written with "%.9g" (enough digits to round-trip
+    binary32); other dtypes use the shortest round-trip repr of the float64
+    value.
     """
 
-    try:
-        import numpy as np
-    except Exception as ex:
-        raise RuntimeError("numpy is required to write CSV") from ex
+    if np is None:
+        raise RuntimeError("numpy is required to write CSV")
 
     if sep == "tab" or sep == "\\t":
         sep = "\t"
@@ -236,16 +719,61 @@ def write_relation_csv(
             chunk_rows = 200_000
 
         # Stream rows in chunks to keep memory bounded.
+        # Each chunk is staged as one float64 block [id, lo.., hi..] (exact
+        # for float32 sources) and formatted by np.savetxt. "%s" on float64
+        # yields the same shortest round-trip text as repr(float(x)).
+        # This is for debugging only; do not use for giant datasets.
+        is_f32 = lower.dtype == np.float32 and upper.dtype == np.float32
+        fmt = ["%d"] + ["%.9g" if is_f32 else "%s"] * (2 * d)
         for i in range(0, n, chunk_rows):
             j = min(n, i + chunk_rows)
-            ids = np.arange(i, j, dtype=np.int64)
-            # Build chunk as strings.
-            # This is for debugging only; do not use for giant datasets.
-            for r, idx in enumerate(ids):
-                row = [str(int(idx))]
-                row += [repr(float(x)) for x in lower[i + r]]
-                row += [repr(float(x)) for x in upper[i + r]]
-                f.write(sep_ch.join(row) + "\n")
+            m = j - i
+            block = np.empty((m, 1 + 2 * d), dtype=np.float64)
+            block[:, 0] = np.arange(i, j, dtype=np.int64)
+            block[:, 1 : 1 + d] = lower[i:j]
+            block[:, 1 + d :] = upper[i:j]
+            np.savetxt(f, block, fmt=fmt, delimiter=sep_ch, newline="\n")
+
+
+def write_relation_npy(
+    path_base: str,
+    lower,
+    upper,
+    *,
+    scalar_bits: int = 32,
+) -> Tuple[str, str]:
+    """Write a relation as two standard NPY files.
+
+    Produces <path_base>.lower.npy and <path_base>.upper.npy, each shaped
+    (n, d). Unlike SJSBOX these load without a custom parser, and
+    `numpy.load(..., mmap_mode="r")` maps them zero-copy (NumPy pads the
+    header so the data starts 64-byte aligned).
+
+    Returns (lower_path, upper_path).
+    """
+
+    if np is None:
+        raise RuntimeError("numpy is required to write NPY files")
+
+    lower = np.asarray(lower)
+    upper = np.asarray(upper)
+    if lower.shape != upper.shape or lower.ndim != 2:
+        raise ValueError("lower/upper must be 2D arrays with the same shape")
+
+    if scalar_bits == 32:
+        dt = np.dtype("<f4")
+    elif scalar_bits == 64:
+        dt = np.dtype("<f8")
+    else:
+        raise ValueError("scalar_bits must be 32 or 64")
+
+    lower_path = path_base + ".lower.npy"
+    upper_path = path_base + ".upper.npy"
+    _ensure_parent_dir(lower_path)
+    for out_path, arr in ((lower_path, lower), (upper_path, upper)):
+        with open(out_path, "wb") as f:
+            np.lib.format.write_array(f, np.ascontiguousarray(arr, dtype=dt), allow_pickle=False)
+    return lower_path, upper_path
 
 
 # ----------------------------
@@ -262,6 +790,73 @@ def _safe_float(x: Any) -> Optional[float]:
         return None
 
 
+def _audit_alpha_sharded(ar, R, S, *, num_pairs: int, seed: int, workers: int) -> Tuple[float, float]:
+    """Pair-sampling audit split into `workers` independent shards.
+
+    workers <= 1 is exactly ar.estimate_alpha_by_pair_sampling(R, S, ...).
+    Otherwise each shard draws its share of pairs from its own seed (spawned
+    from `seed`), shards run on threads (the NumPy gather/compare kernels
+    release the GIL, and R/S are shared without copies), and the shard
+    estimates are combined by a pair-count-weighted mean.
+    """
+    if workers <= 1 or num_pairs < workers:
+        return ar.estimate_alpha_by_pair_sampling(R, S, num_pairs=num_pairs, seed=seed)
+
+    shard_pairs = [num_pairs // workers + (1 if k < num_pairs % workers else 0) for k in range(workers)]
+    shard_seeds = [int(ss.generate_state(1)[0]) for ss in np.random.SeedSequence(seed).spawn(workers)]
+
+    def run(k: int) -> Tuple[float, float]:
+        a, p = ar.estimate_alpha_by_pair_sampling(R, S, num_pairs=shard_pairs[k], seed=shard_seeds[k])
+        return float(a), float(p)
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        shards = list(ex.map(run, range(workers)))
+
+    # alpha_hat is linear in p_hat, so weighting both the same way keeps the
+    # alpha formula inside Alacarte instead of re-deriving it here.
+    alpha_hat = sum(a * m for (a, _), m in zip(shards, shard_pairs)) / num_pairs
+    p_hat = sum(p * m for (_, p), m in zip(shards, shard_pairs)) / num_pairs
+    return float(alpha_hat), float(p_hat)
+
+
+def _orjson_matches_stdlib(obj: Any) -> bool:
+    """True if every float in `obj` formats the same under orjson and json.
+
+    orjson writes NaN/inf as null and drops the exponent padding that repr
+    uses below 1e-4 and from 1e16 up (1e-05 -> 0.00001, 1e+16 -> 1e16).
+    Other floats and all ints, strings and containers come out identical.
+    """
+    if isinstance(obj, float):
+        a = abs(obj)
+        return math.isfinite(obj) and (a == 0.0 or 1e-4 <= a < 1e16)
+    if isinstance(obj, dict):
+        return all(_orjson_matches_stdlib(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return all(_orjson_matches_stdlib(v) for v in obj)
+    return True
+
+
+def _report_json(report: Dict[str, Any], *, indent: bool) -> str:
+    """Serialize the report, via orjson when it is installed.
+
+    orjson is used only when its output matches the stdlib encoder's (see
+    _orjson_matches_stdlib), so indented report files are the same with or
+    without it. The compact form omits the spaces after ',' and ':' on both
+    paths. Falls back to json.dumps otherwise, or if orjson is missing or
+    rejects a value.
+    """
+    if orjson is not None and _orjson_matches_stdlib(report):
+        try:
+            return orjson.dumps(report, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+        except TypeError:
+            pass
+    if indent:
+        return json.dumps(report, ensure_ascii=False, indent=2)
+    # Same compact separators as orjson, so --print_report's format does not
+    # depend on which encoder ran.
+    return json.dumps(report, ensure_ascii=False, separators=(",", ":"))
+
+
 def _load_local_alacarte(module_override: str = ""):
     """Load the local Alacarte generator module from source.
 
@@ -326,6 +921,15 @@ def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
     p.add_argument("--csv_s", type=str, default="", help="override CSV S path")
     p.add_argument("--csv_sep", type=str, default=",", help="CSV separator: ',' or 'tab' or '\\t'")
 
+    # Optional NPY export (mmap-loadable lower/upper arrays).
+    p.add_argument("--write_npy", action="store_true", help="also write <base>.lower.npy/<base>.upper.npy per relation")
+    p.add_argument(
+        "--drop_page_cache",
+        action="store_true",
+        help="after writing, flush outputs and evict them from the page cache (keeps huge one-off writes "
+        "from polluting it; leave off when the files are read right away)",
+    )
+
     # Audit.
     p.add_argument(
         "--audit_pairs",
@@ -334,6 +938,39 @@ def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
         help="num_pairs for pair-sampling audit (0 disables audit)",
     )
     p.add_argument("--audit_seed", type=int, default=0, help="seed for pair-sampling audit")
+    p.add_argument(
+        "--audit_workers",
+        type=int,
+        default=1,
+        help="split the audit into this many parallel shards (1 = single stream, reproducible with older reports)",
+    )
+
+    # Binary payload.
+    p.add_argument(
+        "--compression",
+        type=str,
+        default="none",
+        choices=["none", "blosc"],
+        help="SJSBOX payload compression (blosc output needs a C++ build with -DSJS_WITH_BLOSC=ON)",
+    )
+    p.add_argument(
+        "--layout",
+        type=str,
+        default="aos",
+        choices=["aos", "soa"],
+        help="SJSBOX record layout: per-row records (v1) or lower/upper blocks (v2)",
+    )
+    p.add_argument(
+        "--mmap_write",
+        action="store_true",
+        help="fill SJSBOX payloads through a memory map of the pre-sized file (for very large relations)",
+    )
+    p.add_argument(
+        "--numba_interleave",
+        action="store_true",
+        help="interleave large AoS payloads with a numba kernel (pays off from ~40M rows at d=2; numba caches "
+        "the kernel in __pycache__ next to this script unless NUMBA_CACHE_DIR is set)",
+    )
 
     return p.parse_args(argv)
 
@@ -350,10 +987,16 @@ def main(argv: Optional[list[str]] = None) -> int:
     if not (args.alpha_out >= 0.0):
         _eprint("[rectgen][FATAL] alpha_out must be >= 0")
         return 2
+    if args.audit_workers < 1:
+        _eprint("[rectgen][FATAL] audit_workers must be >= 1")
+        return 2
+    # R and S are written concurrently, so one shared path would interleave
+    # both relations into a single corrupt file.
+    if _same_file(args.out_r, args.out_s):
+        _eprint("[rectgen][FATAL] out_r and out_s must be different files")
+        return 2
 
-    try:
-        import numpy as np
-    except Exception:
+    if np is None:
         _eprint("[rectgen][FATAL] numpy is required")
         return 2
 
@@ -397,34 +1040,40 @@ def main(argv: Optional[list[str]] = None) -> int:
     audit_sec = 0.0
     if int(args.audit_pairs) > 0:
         t1 = time.time()
-        alpha_hat, p_hat = ar.estimate_alpha_by_pair_sampling(
+        alpha_hat, p_hat = _audit_alpha_sharded(
+            ar,
             R,
             S,
             num_pairs=int(args.audit_pairs),
             seed=int(args.audit_seed),
+            workers=int(args.audit_workers),
         )
         audit_sec = time.time() - t1
 
     # Export to SJSBOX binary.
+    # R and S go to separate files, so the two writes run on their own
+    # threads; file writes and the NumPy staging copies release the GIL.
     t2 = time.time()
-    write_sjsbox_relation(
-        args.out_r,
-        R.lower,
-        R.upper,
-        name="R",
-        scalar_bits=32,
-        half_open=True,
-        write_ids=False,
-    )
-    write_sjsbox_relation(
-        args.out_s,
-        S.lower,
-        S.upper,
-        name="S",
-        scalar_bits=32,
-        half_open=True,
-        write_ids=False,
-    )
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        futs = [
+            ex.submit(
+                write_sjsbox_relation,
+                out_path,
+                rel.lower,
+                rel.upper,
+                name=rel_name,
+                scalar_bits=32,
+                half_open=True,
+                write_ids=False,
+                compression=args.compression,
+                layout=args.layout,
+                mmap_write=args.mmap_write,
+                numba_interleave=args.numba_interleave,
+            )
+            for out_path, rel, rel_name in ((args.out_r, R, "R"), (args.out_s, S, "S"))
+        ]
+        for fut in futs:
+            fut.result()
     io_sec = time.time() - t2
 
     # Optional CSV (debug only).
@@ -439,12 +1088,32 @@ def main(argv: Optional[list[str]] = None) -> int:
         write_relation_csv(csv_s_path, S.lower, S.upper, sep=args.csv_sep, include_header=True)
         csv_sec = time.time() - t3
 
+    # Optional NPY.
+    npy_sec = 0.0
+    npy_r_paths: Tuple[str, ...] = ()
+    npy_s_paths: Tuple[str, ...] = ()
+    if args.write_npy:
+        t4 = time.time()
+        npy_r_paths = write_relation_npy(os.path.splitext(args.out_r)[0], R.lower, R.upper)
+        npy_s_paths = write_relation_npy(os.path.splitext(args.out_s)[0], S.lower, S.upper)
+        npy_sec = time.time() - t4
+
+    if args.drop_page_cache:
+        for out_path in (args.out_r, args.out_s, csv_r_path, csv_s_path) + npy_r_paths + npy_s_paths:
+            _drop_page_cache(out_path)
+
     # Prepare report.
     alpha_target = float(args.alpha_out)
     eps_alpha = None
     if alpha_hat is not None and alpha_target != 0.0:
         eps_alpha = abs(float(alpha_hat) - alpha_target) / abs(alpha_target)
 
+    # Same result as os.path.abspath, but with the cwd looked up once.
+    cwd = os.getcwd()
+
+    def _abs(path: str) -> str:
+        return os.path.normpath(os.path.join(cwd, path)) if path else ""
+
     report: Dict[str, Any] = {
         "generator": "alacarte_rectgen",
         "dataset": str(args.dataset_name),
@@ -457,6 +1126,7 @@ def main(argv: Optional[list[str]] = None) -> int:
         "pair_intersection_prob_est": _safe_float(info.get("pair_intersection_prob_est")),
         "audit_num_pairs": int(args.audit_pairs),
         "audit_seed": int(args.audit_seed),
+        "audit_workers": int(args.audit_workers),
         "alpha_hat_est": _safe_float(alpha_hat),
         "p_hat_est": _safe_float(p_hat),
         "epsilon_alpha": _safe_float(eps_alpha),
@@ -471,27 +1141,30 @@ def main(argv: Optional[list[str]] = None) -> int:
             "alacarte_module_path": alacarte_module_path,
         },
         "paths": {
-            "out_r": os.path.abspath(args.out_r),
-            "out_s": os.path.abspath(args.out_s),
-            "csv_r": os.path.abspath(csv_r_path) if csv_r_path else "",
-            "csv_s": os.path.abspath(csv_s_path) if csv_s_path else "",
+            "out_r": _abs(args.out_r),
+            "out_s": _abs(args.out_s),
+            "csv_r": _abs(csv_r_path),
+            "csv_s": _abs(csv_s_path),
+            "npy_r": [_abs(p) for p in npy_r_paths],
+            "npy_s": [_abs(p) for p in npy_s_paths],
         },
         "timing_sec": {
             "generation": float(gen_sec),
             "audit": float(audit_sec),
             "binary_io": float(io_sec),
             "csv_io": float(csv_sec),
+            "npy_io": float(npy_sec),
         },
     }
 
     if args.report_path:
         _ensure_parent_dir(args.report_path)
         with open(args.report_path, "w", encoding="utf-8") as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write(_report_json(report, indent=True))
             f.write("\n")
 
     if args.print_report:
-        print(json.dumps(report, ensure_ascii=False))
+        print(_report_json(report, indent=False))
 
     return 0
 